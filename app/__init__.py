@@ -6,8 +6,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate  # NEW: for database migrations
 
+from .routing import RoutingSession
+
 # ── Initialize extensions ───────────────────────────────────────────────────────
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # read/write routing, see app/routing.py
 migrate = Migrate()         # NEW: instantiate Migrate without app
 login_manager = LoginManager()
 
@@ -32,12 +34,52 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///vehicles.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Read/write routing (app/routing.py): GET requests read through a read-only
+    # pool, reports through their own pool; writes always use the primary.
+    # Leave the URIs unset to open vehicles.db read-only (mode=ro).
+    app.config['SQLALCHEMY_READ_URI'] = os.environ.get('SQLALCHEMY_READ_URI')
+    app.config['SQLALCHEMY_REPORT_URI'] = os.environ.get('SQLALCHEMY_REPORT_URI')
+    app.config['FLEET_READ_POOL_SIZE'] = int(os.environ.get('FLEET_READ_POOL_SIZE', 10))
+    app.config['FLEET_REPORT_POOL_SIZE'] = int(os.environ.get('FLEET_REPORT_POOL_SIZE', 2))
+    app.config['FLEET_SQLITE_WAL'] = os.environ.get('FLEET_SQLITE_WAL', '1') == '1'
+
     # ── Upload config ────────────────────────────────────────────────────────────
     UPLOAD_FOLDER = os.path.join(app.root_path, 'static', 'uploads')
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB limit
 
+    # ── Archive config ───────────────────────────────────────────────────────────
+    # Fuel and maintenance rows older than the cutoff move to a separate SQLite
+    # file attached as schema 'archive' (see app/archive.py).
+    app.config['FLEET_ARCHIVE_PATH'] = os.environ.get(
+        'FLEET_ARCHIVE_PATH', os.path.join(app.instance_path, 'archive.db'))
+    app.config['FLEET_ARCHIVE_AFTER_DAYS'] = int(os.environ.get('FLEET_ARCHIVE_AFTER_DAYS', 730))
+
+    # ── KPI snapshot config ──────────────────────────────────────────────────────
+    # The dashboard reads a materialized snapshot. One refresher thread rebuilds
+    # it on this interval and shortly after writes to fleet tables from any process.
+    # FLEET_KPI_SCHEDULER: 'worker' (runs in `flask fleet worker`), 'web' (in each
+    # web process; for development without a worker) or '0' (off).
+    app.config['FLEET_KPI_SCHEDULER'] = os.environ.get('FLEET_KPI_SCHEDULER', 'worker')
+    app.config['FLEET_KPI_REFRESH_SECONDS'] = int(os.environ.get('FLEET_KPI_REFRESH_SECONDS', 300))
+    app.config['FLEET_KPI_POLL_SECONDS'] = int(os.environ.get('FLEET_KPI_POLL_SECONDS', 10))
+    app.config['FLEET_KPI_DEBOUNCE_SECONDS'] = int(os.environ.get('FLEET_KPI_DEBOUNCE_SECONDS', 5))
+
+    # ── Background jobs & notifications ──────────────────────────────────────────
+    # Slow work is queued in the job table and run by `flask fleet worker`.
+    app.config['FLEET_JOB_STALE_SECONDS'] = int(os.environ.get('FLEET_JOB_STALE_SECONDS', 1800))
+    app.config['FLEET_JOB_HEARTBEAT_SECONDS'] = int(os.environ.get('FLEET_JOB_HEARTBEAT_SECONDS', 60))
+    app.config['FLEET_JOB_BACKOFF_SECONDS'] = int(os.environ.get('FLEET_JOB_BACKOFF_SECONDS', 30))
+    app.config['FLEET_JOB_BACKOFF_CAP_SECONDS'] = int(os.environ.get('FLEET_JOB_BACKOFF_CAP_SECONDS', 3600))
+    app.config['FLEET_RENEWAL_NOTICE_DAYS'] = int(os.environ.get('FLEET_RENEWAL_NOTICE_DAYS', 30))
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER')          # unset → digests are only logged
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') == '1'
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'fleet@localhost')
+
     # ── Load CSV headers for dynamic form fields ─────────────────────────────────
     project_root = os.path.abspath(os.path.join(app.root_path, os.pardir))
     header_path = os.path.join(project_root, 'vEHICLES.txt')
@@ -51,15 +93,31 @@ def create_app():
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
+    from . import kpi, archive
+    kpi.init_app(app)
+    os.makedirs(app.instance_path, exist_ok=True)
+    archive.init_app(app)   # before create_all so the archive tables get created
+
     # ── Create database tables if they don’t exist ───────────────────────────────
     # If you prefer using migrations only, you can remove or comment out create_all()
     with app.app_context():
         db.create_all()
 
+    # ── Read/write session routing (needs the database files to exist) ───────────
+    from . import routing
+    routing.init_app(app)
+
     # ── Register blueprints ───────────────────────────────────────────────────────
     from .routes import main
     from .auth   import auth
     app.register_blueprint(main)
     app.register_blueprint(auth)
 
+    # ── Register job handlers ────────────────────────────────────────────────────
+    from . import tasks  # noqa: F401  (registers handlers with app.jobs)
+
+    # ── Register CLI commands (flask fleet ...) ──────────────────────────────────
+    from .commands import fleet
+    app.cli.add_command(fleet)
+
     return app
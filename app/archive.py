@@ -0,0 +1,134 @@
+# app/archive.py
+# Hot/cold archival of fuel and maintenance history.
+# Old rows move into a separate SQLite file attached to every connection as
+# schema "archive", so one SQL statement can read hot and archived rows together.
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, event, insert, literal, select, union_all
+
+from .models import FuelLog, MaintenanceLog, ArchivedFuelLog, ArchivedMaintenanceLog
+from . import db, events
+
+# (hot model, archive model, date column name) for each archived table
+ARCHIVED = (
+    (FuelLog, ArchivedFuelLog, 'date'),
+    (MaintenanceLog, ArchivedMaintenanceLog, 'service_date'),
+)
+
+# ────────────────────────────────────────────────────────────────────────────────
+def attach(engine, path, readonly=False):
+    """
+    ATTACH the archive database as schema 'archive' on every new connection
+    of this engine. Must be called before the engine hands out connections.
+    """
+    target = f'file:{path}?mode=ro' if readonly else path
+
+    @event.listens_for(engine, 'connect')
+    def _attach_archive(dbapi_connection, connection_record):
+        dbapi_connection.execute('ATTACH DATABASE ? AS archive', (target,))
+
+def init_app(app):
+    """Attach the archive to the app's engine; db.create_all() then creates its tables."""
+    with app.app_context():
+        attach(db.engine, app.config['FLEET_ARCHIVE_PATH'])
+
+# ────────────────────────────────────────────────────────────────────────────────
+def _union(model_pair, *columns):
+    """
+    Select `columns` (names) from a hot table and its archive, UNION ALL'd.
+    Returns a subquery whose columns carry the same names, for rollups that
+    should count archived history too.
+    """
+    hot, cold = model_pair
+    return union_all(
+        select(*(getattr(hot, c) for c in columns)),
+        select(*(getattr(cold, c) for c in columns)),
+    ).subquery()
+
+def fuel_union(*columns):
+    return _union((FuelLog, ArchivedFuelLog), *columns)
+
+def maintenance_union(*columns):
+    return _union((MaintenanceLog, ArchivedMaintenanceLog), *columns)
+
+def fuel_history(vehicle_id):
+    """Hot and archived fuel logs for one vehicle, newest first."""
+    rows = (
+        FuelLog.query.filter_by(vehicle_id=vehicle_id).all()
+        + ArchivedFuelLog.query.filter_by(vehicle_id=vehicle_id).all()
+    )
+    return sorted(rows, key=lambda r: r.date, reverse=True)
+
+def maintenance_history(vehicle_id):
+    """Hot and archived maintenance logs for one vehicle, newest first."""
+    rows = (
+        MaintenanceLog.query.filter_by(vehicle_id=vehicle_id).all()
+        + ArchivedMaintenanceLog.query.filter_by(vehicle_id=vehicle_id).all()
+    )
+    return sorted(rows, key=lambda r: r.service_date, reverse=True)
+
+# ────────────────────────────────────────────────────────────────────────────────
+def archive_before(cutoff):
+    """
+    Move fuel and maintenance rows dated before `cutoff` into the archive.
+    Archived rows keep their original id, and both steps are idempotent:
+    - copy:   INSERT OR IGNORE, so a retried run does not copy a row twice
+    - delete: only hot rows with an identical archived copy (same id and
+              values), so nothing is deleted unarchived, not even a row that
+              reused the id of one archived earlier
+    The copy is committed before the delete: with the main database in WAL mode
+    SQLite cannot commit both files atomically, so a crash or a failed delete
+    leaves a row in both until the next run removes the hot copy.
+    Returns {table name: rows moved}.
+    """
+    moved = {}
+    archived_at = datetime.utcnow()
+    for hot, cold, date_col in ARCHIVED:
+        columns = [c.name for c in hot.__table__.columns]
+        db.session.execute(
+            insert(cold.__table__).prefix_with('OR IGNORE').from_select(
+                columns + ['archived_at'],
+                select(*(hot.__table__.c[c] for c in columns), literal(archived_at, db.DateTime))
+                .where(getattr(hot, date_col) < cutoff),
+            )
+        )
+    db.session.commit()
+
+    for hot, cold, date_col in ARCHIVED:
+        hot_t, cold_t = hot.__table__, cold.__table__
+        archived = select(cold_t.c.id).where(
+            *(cold_t.c[c.name].is_not_distinct_from(c) for c in hot_t.columns)
+        ).exists()
+        result = db.session.execute(
+            delete(hot_t).where(getattr(hot, date_col) < cutoff, archived)
+        )
+        moved[hot.__tablename__] = result.rowcount
+        if result.rowcount:
+            events.record(db.session, 'delete', hot.__tablename__)
+    db.session.commit()
+    return moved
+
+def reclaim_space(max_pages=None):
+    """
+    Return free pages in the main database to the filesystem.
+    The first run switches the file to auto_vacuum=INCREMENTAL, which needs
+    one full VACUUM; later runs only do an incremental vacuum.
+    Returns 'converted' or 'incremental'.
+    """
+    db.session.commit()
+    with db.engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+        mode = conn.exec_driver_sql('PRAGMA main.auto_vacuum').scalar()
+        if mode != 2:
+            conn.exec_driver_sql('PRAGMA main.auto_vacuum = INCREMENTAL')
+            conn.exec_driver_sql('VACUUM main')
+            return 'converted'
+        # executescript steps the pragma to completion; execute() frees one page
+        pages = f'({int(max_pages)})' if max_pages else ''
+        conn.connection.driver_connection.executescript(f'PRAGMA main.incremental_vacuum{pages};')
+        return 'incremental'
+
+def default_cutoff(app):
+    """Cutoff date from FLEET_ARCHIVE_AFTER_DAYS."""
+    return date.today() - timedelta(days=app.config['FLEET_ARCHIVE_AFTER_DAYS'])
@@ -0,0 +1,129 @@
+# app/commands.py
+# `flask fleet ...` command-line jobs
+
+import csv
+import json
+import time
+
+import click
+from flask.cli import AppGroup
+
+fleet = AppGroup('fleet', help='Fleet maintenance and batch jobs.')
+
+# ────────────────────────────────────────────────────────────────────────────────
+@fleet.command('reconcile-fuel')
+@click.argument('statement', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Match and report without inserting rows.')
+@click.option('--exceptions', type=click.Path(dir_okay=False),
+              help='Write unmatched, duplicate and invalid transactions to this CSV.')
+def reconcile_fuel(statement, dry_run, exceptions):
+    """
+    Reconcile a fuel-card STATEMENT (CSV) into fuel logs.
+    """
+    from .fuelcard import reconcile_file
+    from . import db
+
+    report = reconcile_file(statement, commit=not dry_run)
+    if dry_run:
+        db.session.rollback()
+
+    click.echo(f"Transactions: {report['total']}")
+    click.echo(f"Inserted:     {report['inserted']}{' (dry run, rolled back)' if dry_run else ''}")
+    click.echo(f"Relinked:     {report['relinked']} existing fill(s) re-pointed at a new reading")
+    click.echo(f"Unmatched:    {len(report['unmatched'])}")
+    click.echo(f"Duplicates:   {len(report['duplicates'])}")
+    click.echo(f"Invalid:      {len(report['invalid'])}")
+
+    if exceptions:
+        fields = ['status', 'line', 'card_no', 'unit_no', 'vin', 'date', 'odometer',
+                  'gallons', 'total_cost', 'transaction_id', 'reason']
+        with open(exceptions, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for status in ('unmatched', 'duplicates', 'invalid'):
+                for tx in report[status]:
+                    writer.writerow({'status': status, **tx})
+        click.echo(f'Exceptions written to {exceptions}')
+
+# ────────────────────────────────────────────────────────────────────────────────
+@fleet.command('forecast')
+@click.option('--workers', type=int, default=None,
+              help='Worker processes (default: in-process below 50,000 vehicles, else CPU count).')
+@click.option('--chunk-size', type=int, default=2000, show_default=True,
+              help='Vehicles per task handed to a worker.')
+def forecast(workers, chunk_size):
+    """
+    Recompute replacement dates and cost of ownership for the whole fleet.
+    """
+    from .forecast import run_forecast
+
+    started = time.monotonic()
+    count = run_forecast(workers=workers, chunk_size=chunk_size)
+    click.echo(f'Forecast {count} vehicles in {time.monotonic() - started:.1f}s')
+
+# ────────────────────────────────────────────────────────────────────────────────
+@fleet.command('archive')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Archive rows dated before this day (default: FLEET_ARCHIVE_AFTER_DAYS ago).')
+@click.option('--vacuum-pages', type=int, default=None,
+              help='Free at most this many pages in the incremental vacuum (default: all).')
+@click.option('--no-vacuum', is_flag=True, help='Skip reclaiming space afterwards.')
+def archive(before, vacuum_pages, no_vacuum):
+    """
+    Move old fuel and maintenance logs into the archive database.
+    """
+    from flask import current_app
+    from .archive import archive_before, default_cutoff, reclaim_space
+
+    cutoff = before.date() if before else default_cutoff(current_app)
+    moved = archive_before(cutoff)
+    for table, count in moved.items():
+        click.echo(f'{table}: {count} rows archived (before {cutoff})')
+
+    if not no_vacuum:
+        mode = reclaim_space(vacuum_pages)
+        if mode == 'converted':
+            click.echo('Switched vehicles.db to incremental auto-vacuum (one-time full VACUUM).')
+        else:
+            click.echo('Incremental vacuum done.')
+
+# ────────────────────────────────────────────────────────────────────────────────
+@fleet.command('worker')
+@click.option('--once', is_flag=True, help='Run the jobs that are due, then exit.')
+@click.option('--poll', type=float, default=2.0, show_default=True,
+              help='Seconds to sleep when the queue is empty.')
+def worker(once, poll):
+    """
+    Run background jobs from the job queue.
+
+    Unless --once, also runs the KPI snapshot refresher for the whole app
+    (FLEET_KPI_SCHEDULER=worker, the default).
+    """
+    from flask import current_app
+    from .jobs import work
+    from .kpi import start_scheduler
+
+    app = current_app._get_current_object()
+    if app.config['FLEET_KPI_SCHEDULER'] == 'worker' and not once:
+        start_scheduler(app)
+    click.echo('Worker started; waiting for jobs' + (' (once)' if once else ''))
+    work(app, poll_interval=poll, once=once, log=click.echo)
+
+@fleet.command('enqueue')
+@click.argument('kind')
+@click.option('--payload', default='{}', help='Job arguments as a JSON object.')
+@click.option('--priority', type=int, default=0, show_default=True)
+def enqueue_job(kind, payload, priority):
+    """
+    Queue a job of KIND, e.g. from cron:
+
+    \b
+      flask fleet enqueue renewal_digest
+      flask fleet enqueue forecast --priority -5
+    """
+    from .jobs import enqueue, HANDLERS
+
+    if kind not in HANDLERS:
+        raise click.BadParameter(f"unknown kind; choose from {', '.join(sorted(HANDLERS))}")
+    job = enqueue(kind, json.loads(payload), priority=priority)
+    click.echo(f'Queued job {job.id} ({kind})')
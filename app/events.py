@@ -0,0 +1,110 @@
+# app/events.py
+# Write events: collect what each session flushes and hand it to
+# subscribers once the transaction has committed.
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+_subscribers = []
+_versioned = {}     # table name → callbacks(before, after)
+
+class Change:
+    """
+    One committed row change:
+    - op     = 'insert', 'update' or 'delete'
+    - table  = table name of the mapped class
+    - id     = primary key (None for bulk statements)
+    - values = loaded column values at flush time (empty for bulk statements)
+    """
+    __slots__ = ('op', 'table', 'id', 'values')
+
+    def __init__(self, op, table, id=None, values=None):
+        self.op = op
+        self.table = table
+        self.id = id
+        self.values = values or {}
+
+    def __repr__(self):
+        return f'<Change {self.op} {self.table}:{self.id}>'
+
+def subscribe(callback):
+    """
+    Register callback(changes) to run after every commit that changed rows.
+    Callbacks run on the committing thread, outside the transaction, and must not
+    emit SQL on the committing session; hand heavier work to a thread or job.
+    """
+    _subscribers.append(callback)
+    return callback
+
+def versioned(table, callback=None):
+    """
+    Keep a table_version counter for `table`, bumped in the same transaction as
+    every write to it, so other processes can tell their cached copy is stale.
+    callback(before, after) runs after this process commits its own bumps:
+    `before` is the counter value just before the transaction's first bump.
+    """
+    callbacks = _versioned.setdefault(table, [])
+    if callback:
+        callbacks.append(callback)
+
+def record(session, op, table, id=None, values=None):
+    """Record a change the ORM cannot see, e.g. a bulk insert() executed on the session."""
+    session.info.setdefault('fleet_changes', []).append(Change(op, table, id, values))
+    _bump(session, {table})
+
+def _bump(session, tables):
+    """Increment the table_version counter of each versioned table in `tables`."""
+    from .models import TableVersion
+
+    bumped = session.info.setdefault('fleet_versions', {})
+    for table in tables:
+        if table not in _versioned:
+            continue
+        stmt = (
+            sqlite_insert(TableVersion)
+            .values(name=table, version=1)
+            .on_conflict_do_update(index_elements=['name'], set_={'version': TableVersion.version + 1})
+            .returning(TableVersion.version)
+        )
+        after = session.execute(stmt).scalar()
+        first = bumped.get(table, (after - 1, after))[0]
+        bumped[table] = (first, after)
+
+def _snapshot(obj):
+    """Loaded column values for obj (no lazy loads; expired columns are left out)."""
+    state = inspect(obj)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+# ────────────────────────────────────────────────────────────────────────────────
+@event.listens_for(Session, 'after_flush')
+def _collect(session, flush_context):
+    changes = session.info.setdefault('fleet_changes', [])
+    touched = set()
+    for op, objs in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objs:
+            if op == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            table = getattr(obj, '__tablename__', None)
+            if not table:
+                continue
+            identity = inspect(obj).identity
+            changes.append(Change(op, table, identity[0] if identity else None, _snapshot(obj)))
+            touched.add(table)
+    _bump(session, touched)
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch(session):
+    changes = session.info.pop('fleet_changes', None)
+    versions = session.info.pop('fleet_versions', None)
+    if changes:
+        for callback in _subscribers:
+            callback(changes)
+    for table, (before, after) in (versions or {}).items():
+        for callback in _versioned.get(table, ()):
+            callback(before, after)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard(session):
+    session.info.pop('fleet_changes', None)
+    session.info.pop('fleet_versions', None)
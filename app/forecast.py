@@ -0,0 +1,221 @@
+# app/forecast.py
+# Lifecycle and replacement forecasting.
+# Inputs are bulk-loaded with three queries, the per-vehicle projection runs
+# in-process or, for large fleets on multi-core hosts, across a process pool in
+# chunks, and results replace the vehicle_forecast table.
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from .models import Vehicle, VehicleForecast
+from .archive import fuel_union, maintenance_union
+from .routing import routed
+from .utils import parse_date, parse_number
+from . import db
+
+# Fleetmate fields the forecast reads out of Vehicle.data
+FLEETMATE_FIELDS = (
+    'AM_PURCHPRICE', 'DT_PURCH', 'NO_PURCHODOMETER', 'NO_PURCHHOURS',
+    'NO_REPL_METER', 'NO_REPL_HOURS', 'DT_REPL_DATE',
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Fleet size from which run_forecast() uses the process pool by default.
+# Measured on CPython 3.11: a projection costs 10-25 µs per vehicle, pickling a
+# vehicle to a worker and its result back ~7 µs (half of it serial in the
+# parent), and every spawned worker spends ~0.7 s importing the app first.
+# Modelled from those costs, break-even is near 40k vehicles on 8 cores, 50k on
+# 4 and 125k on 2; below it the pool is slower than the plain loop
+# (2k vehicles: 3.7 s pooled vs 0.2 s in-process).
+POOL_MIN_VEHICLES = 50000
+
+# ────────────────────────────────────────────────────────────────────────────────
+def load_inputs():
+    """
+    Gather everything the projection needs as plain, picklable dicts:
+    - vehicle columns plus the raw Fleetmate fields above (json_extract, not the whole blob)
+    - fuel totals and first/last readings per vehicle (hot + archived)
+    - maintenance totals per vehicle (hot + archived)
+    """
+    fleetmate = [Vehicle.data[name].as_string().label(name) for name in FLEETMATE_FIELDS]
+    inputs = {}
+    for row in db.session.execute(
+        select(Vehicle.id, Vehicle.odometer, Vehicle.hours, *fleetmate)
+    ).mappings():
+        inputs[row['id']] = {
+            'id':       row['id'],
+            'odometer': row['odometer'],
+            'hours':    row['hours'],
+            # Raw Fleetmate strings; parsed in the workers
+            **{name: row[name] for name in FLEETMATE_FIELDS},
+            'fuel_cost': 0.0, 'fuel_first_date': None, 'fuel_last_date': None,
+            'fuel_first_od': None, 'fuel_last_od': None,
+            'maint_cost': 0.0, 'maint_first_date': None,
+        }
+
+    f = fuel_union('vehicle_id', 'total_cost', 'date', 'last_od', 'curr_od')
+    fuel = db.session.execute(
+        select(
+            f.c.vehicle_id,
+            func.sum(f.c.total_cost),
+            func.min(f.c.date), func.max(f.c.date),
+            func.min(f.c.last_od), func.max(f.c.curr_od),
+        ).group_by(f.c.vehicle_id)
+    )
+    for vehicle_id, cost, first, last, first_od, last_od in fuel:
+        if vehicle_id in inputs:
+            inputs[vehicle_id].update(
+                fuel_cost=cost or 0.0, fuel_first_date=first, fuel_last_date=last,
+                fuel_first_od=first_od, fuel_last_od=last_od,
+            )
+
+    m = maintenance_union('vehicle_id', 'cost', 'service_date')
+    maintenance = db.session.execute(
+        select(
+            m.c.vehicle_id,
+            func.sum(m.c.cost),
+            func.min(m.c.service_date),
+        ).group_by(m.c.vehicle_id)
+    )
+    for vehicle_id, cost, first in maintenance:
+        if vehicle_id in inputs:
+            inputs[vehicle_id].update(maint_cost=cost or 0.0, maint_first_date=first)
+
+    return list(inputs.values())
+
+# ────────────────────────────────────────────────────────────────────────────────
+def project_vehicle(v, today):
+    """
+    Project one vehicle's replacement date and total cost of ownership.
+    Pure function of its input dict, so it can run in a worker process.
+
+    - Usage rate comes from the fuel history when it spans more than a day,
+      otherwise from the purchase odometer and purchase date.
+    - Replacement is the earliest of DT_REPL_DATE, the date the odometer reaches
+      NO_REPL_METER, and the date the hour meter reaches NO_REPL_HOURS.
+    - Fuel and maintenance spend is extended to the replacement date at the
+      run rate observed since purchase (or since the first record).
+    """
+    purchase_price = parse_number(v['AM_PURCHPRICE']) or 0.0
+    purch_date     = parse_date(v['DT_PURCH'])
+    purch_odometer = parse_number(v['NO_PURCHODOMETER'])
+    purch_hours    = parse_number(v['NO_PURCHHOURS'])
+    repl_meter     = parse_number(v['NO_REPL_METER'])
+    repl_hours     = parse_number(v['NO_REPL_HOURS'])
+    repl_date      = parse_date(v['DT_REPL_DATE'])
+    maint_first    = parse_date(v['maint_first_date'])
+
+    current_od = max(v['odometer'] or 0, v['fuel_last_od'] or 0) or None
+
+    # 1) Miles per day
+    miles_per_day = None
+    first, last = v['fuel_first_date'], v['fuel_last_date']
+    if first and last and (last - first).days > 0 and v['fuel_last_od'] and v['fuel_first_od'] is not None:
+        miles_per_day = (v['fuel_last_od'] - v['fuel_first_od']) / (last - first).days
+    elif purch_date and current_od and purch_odometer is not None:
+        days_owned = (today - purch_date).days
+        if days_owned > 0:
+            miles_per_day = (current_od - purch_odometer) / days_owned
+
+    # 2) Replacement candidates
+    candidates = []
+    if repl_date:
+        candidates.append((repl_date, 'date'))
+    if repl_meter and current_od and miles_per_day and miles_per_day > 0:
+        days_left = max((repl_meter - current_od) / miles_per_day, 0)
+        candidates.append((today + timedelta(days=int(days_left)), 'meter'))
+    if repl_hours and v['hours'] and purch_date and purch_hours is not None:
+        days_owned = (today - purch_date).days
+        hours_per_day = (v['hours'] - purch_hours) / days_owned if days_owned > 0 else 0
+        if hours_per_day > 0:
+            days_left = max((repl_hours - v['hours']) / hours_per_day, 0)
+            candidates.append((today + timedelta(days=int(days_left)), 'hours'))
+    replacement_date, basis = min(candidates) if candidates else (None, None)
+
+    # 3) Cost of ownership
+    spent = v['fuel_cost'] + v['maint_cost']
+    observed_from = purch_date or min(
+        (d for d in (v['fuel_first_date'], maint_first) if d), default=None
+    )
+    projected = 0.0
+    if observed_from and replacement_date and replacement_date > today:
+        run_rate = spent / max((today - observed_from).days, 1)
+        projected = run_rate * (replacement_date - today).days
+    total_cost = purchase_price + spent + projected
+
+    cost_per_mile = None
+    lifetime_miles = None
+    if current_od:
+        end_od = current_od
+        if replacement_date and miles_per_day and replacement_date > today:
+            end_od += miles_per_day * (replacement_date - today).days
+        lifetime_miles = end_od - (purch_odometer or 0)
+    if lifetime_miles and lifetime_miles > 0:
+        cost_per_mile = total_cost / lifetime_miles
+
+    return {
+        'vehicle_id':        v['id'],
+        'current_odometer':  current_od,
+        'miles_per_day':     miles_per_day,
+        'replacement_date':  replacement_date,
+        'replacement_basis': basis,
+        'purchase_price':    purchase_price,
+        'fuel_cost':         v['fuel_cost'],
+        'maintenance_cost':  v['maint_cost'],
+        'projected_cost':    projected,
+        'total_cost':        total_cost,
+        'cost_per_mile':     cost_per_mile,
+    }
+
+def forecast_chunk(chunk, today):
+    """Worker entry point: project every vehicle in one chunk."""
+    return [project_vehicle(v, today) for v in chunk]
+
+# ────────────────────────────────────────────────────────────────────────────────
+def _usable_cpus():
+    """CPUs this process may run on (respects container/affinity limits)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def run_forecast(workers=None, chunk_size=DEFAULT_CHUNK_SIZE, today=None, pool_min=POOL_MIN_VEHICLES):
+    """
+    Recompute the forecast for the whole fleet and replace vehicle_forecast.
+    - workers:    process count; 1 runs in-process. Default: in-process below
+                  `pool_min` vehicles, otherwise one per usable CPU
+    - chunk_size: vehicles per task handed to a worker
+    Returns the number of vehicles forecast.
+    """
+    today = today or date.today()
+    with routed('report'):
+        inputs = load_inputs()
+    chunks = [inputs[i:i + chunk_size] for i in range(0, len(inputs), chunk_size)]
+    if workers is None:
+        workers = _usable_cpus() if len(inputs) >= pool_min else 1
+
+    results = []
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            results.extend(forecast_chunk(chunk, today))
+    else:
+        # spawn, not fork: the web process may be running background threads
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=ctx) as pool:
+            for rows in pool.map(forecast_chunk, chunks, [today] * len(chunks)):
+                results.extend(rows)
+
+    computed_at = datetime.utcnow()
+    for row in results:
+        row['computed_at'] = computed_at
+
+    db.session.execute(delete(VehicleForecast))
+    if results:
+        db.session.execute(insert(VehicleForecast), results)
+    db.session.commit()
+    return len(results)
@@ -0,0 +1,290 @@
+# app/fuelcard.py
+# Fuel-card statement reconciliation: match card transactions to vehicles
+# and bulk-insert the resulting FuelLog rows.
+
+import csv
+import re
+from collections import defaultdict
+
+from sqlalchemy import func, insert, select, update
+
+from .models import Vehicle, FuelLog, ArchivedFuelLog
+from .archive import fuel_union
+from .utils import parse_date, parse_number
+from . import db, events
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Statement columns we understand, keyed by normalized header name.
+# Card vendors label the same thing differently, so several aliases map to one field.
+COLUMN_ALIASES = {
+    'card_no':        ('cardno', 'cardnumber', 'card', 'fuelcard', 'txfuelcard'),
+    'unit_no':        ('unitno', 'unitnumber', 'unit', 'vehicle', 'vehicleno', 'vehiclenumber'),
+    'vin':            ('vin', 'vehiclevin'),
+    'date':           ('date', 'transactiondate', 'txndate', 'transdate'),
+    'odometer':       ('odometer', 'odo', 'currentodometer', 'odometerreading'),
+    'gallons':        ('gallons', 'units', 'quantity', 'qty', 'fuelquantity'),
+    'total_cost':     ('totalcost', 'amount', 'total', 'totalfuelcost', 'netcost'),
+    'transaction_id': ('transactionid', 'transactionno', 'txnid', 'reference', 'authno'),
+}
+
+def _normalize_header(name):
+    """Lower-case a header and drop everything but letters and digits."""
+    return re.sub(r'[^a-z0-9]', '', (name or '').lower())
+
+def _normalize_card(value):
+    """Card numbers are compared on their digits only."""
+    return re.sub(r'\D', '', value or '')
+
+def _normalize_key(value):
+    """Unit numbers and VINs are compared trimmed and upper-cased."""
+    return (value or '').strip().upper()
+
+def _column_map(fieldnames):
+    """
+    Map each statement field we know about to the CSV column that holds it.
+    Raises ValueError if the file has no date, odometer, gallons or cost column,
+    or no column that can identify the vehicle.
+    """
+    by_norm = {_normalize_header(f): f for f in fieldnames or []}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in by_norm:
+                columns[field] = by_norm[alias]
+                break
+
+    missing = [f for f in ('date', 'odometer', 'gallons', 'total_cost') if f not in columns]
+    if missing:
+        raise ValueError(f"Statement is missing required column(s): {', '.join(missing)}")
+    if not any(f in columns for f in ('card_no', 'unit_no', 'vin')):
+        raise ValueError('Statement needs a card number, unit number or VIN column')
+    return columns
+
+# ────────────────────────────────────────────────────────────────────────────────
+class VehicleIndex:
+    """
+    In-memory hash index over the vehicle table:
+    - card number (Fleetmate TX_FUELCARD), unit number and VIN → vehicle id
+    Built from a single query that reads only the columns it needs.
+    """
+
+    def __init__(self):
+        self.by_card = {}
+        self.by_unit = {}
+        self.by_vin = {}
+
+    @classmethod
+    def load(cls):
+        index = cls()
+        card = Vehicle.data['TX_FUELCARD'].as_string()
+        rows = db.session.execute(
+            select(Vehicle.id, Vehicle.unit_no, Vehicle.vin, card)
+        )
+        for vehicle_id, unit_no, vin, card_no in rows:
+            if card_no:
+                index.by_card[_normalize_card(card_no)] = vehicle_id
+            if unit_no:
+                index.by_unit[_normalize_key(unit_no)] = vehicle_id
+            if vin:
+                index.by_vin[_normalize_key(vin)] = vehicle_id
+        return index
+
+    def match(self, card_no=None, unit_no=None, vin=None):
+        """Return the vehicle id for a transaction: card first, then unit number, then VIN."""
+        card_no = _normalize_card(card_no)
+        if card_no and card_no in self.by_card:
+            return self.by_card[card_no]
+        unit_no = _normalize_key(unit_no)
+        if unit_no and unit_no in self.by_unit:
+            return self.by_unit[unit_no]
+        vin = _normalize_key(vin)
+        if vin and vin in self.by_vin:
+            return self.by_vin[vin]
+        return None
+
+# ────────────────────────────────────────────────────────────────────────────────
+def read_statement(path):
+    """
+    Read a fuel-card statement CSV into a list of plain dicts with the fields
+    in COLUMN_ALIASES (values still raw strings), plus the source line number.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = _column_map(reader.fieldnames)
+        return [
+            {
+                'line': line_no,
+                **{field: (row.get(col) or '').strip() for field, col in columns.items()},
+            }
+            for line_no, row in enumerate(reader, start=2)
+        ]
+
+def _known_readings(vehicle_ids, start):
+    """
+    Fuel-log readings the statement has to slot in between, per vehicle,
+    hot and archived alike:
+    - seeds:    the highest reading dated before `start`
+    - timeline: every reading from `start` on, as (date, odometer, fuel_log id);
+                the id is None for archived readings, which are never relinked
+    The vehicle's own odometer field is not used: it is the current reading,
+    so it says nothing about what came before an older transaction.
+    """
+    seeds = {}
+    f = fuel_union('vehicle_id', 'date', 'curr_od')
+    rows = db.session.execute(
+        select(f.c.vehicle_id, func.max(f.c.curr_od))
+        .where(f.c.date < start)
+        .group_by(f.c.vehicle_id)
+    )
+    for vehicle_id, curr_od in rows:
+        if vehicle_id in vehicle_ids and curr_od is not None:
+            seeds[vehicle_id] = curr_od
+
+    timeline = defaultdict(list)
+    for model, relinkable in ((FuelLog, True), (ArchivedFuelLog, False)):
+        rows = db.session.execute(
+            select(model.vehicle_id, model.date, model.curr_od, model.id)
+            .where(model.date >= start)
+        )
+        for vehicle_id, log_date, curr_od, log_id in rows:
+            if vehicle_id in vehicle_ids:
+                timeline[vehicle_id].append((log_date, curr_od, log_id if relinkable else None, None))
+    return seeds, timeline
+
+def _existing_keys(start, end):
+    """Fingerprints of fuel-log rows already on file (hot or archived) in the statement's date range."""
+    f = fuel_union('vehicle_id', 'date', 'curr_od', 'gallons', 'total_cost')
+    rows = db.session.execute(
+        select(
+            f.c.vehicle_id, f.c.date, f.c.curr_od,
+            f.c.gallons, f.c.total_cost
+        ).where(f.c.date.between(start, end))
+    )
+    return {
+        (vid, d, od, round(gal, 3), round(cost, 2))
+        for vid, d, od, gal, cost in rows
+    }
+
+def reconcile_statement(transactions, commit=True):
+    """
+    Reconcile parsed statement transactions against the fleet:
+    - match each one to a vehicle via the card/unit/VIN index
+    - reject reversal/credit lines (negative gallons, cost or odometer) as invalid
+    - drop duplicates (repeated transaction ids, or the same vehicle, date,
+      odometer, gallons and cost seen earlier in the file or already on file)
+    - merge them with the readings already on file by (date, odometer), so a
+      statement can cover a period before newer hand-entered fills
+    - take last_od from the reading just before each transaction, flag readings
+      that go backwards against either neighbour, and re-point the next
+      existing fill's last_od at the new reading
+    - bulk-insert the FuelLog rows in one statement
+    Returns a report dict with the inserted and relinked counts and the
+    unmatched, duplicate and invalid transactions.
+    """
+    report = {'total': len(transactions), 'inserted': 0, 'relinked': 0,
+              'unmatched': [], 'duplicates': [], 'invalid': []}
+
+    index = VehicleIndex.load()
+
+    # 1) Parse values and match vehicles
+    matched = defaultdict(list)
+    seen_ids = set()
+    for tx in transactions:
+        tx_id = tx.get('transaction_id')
+        if tx_id:
+            if tx_id in seen_ids:
+                report['duplicates'].append(tx)
+                continue
+            seen_ids.add(tx_id)
+
+        vehicle_id = index.match(tx.get('card_no'), tx.get('unit_no'), tx.get('vin'))
+        if vehicle_id is None:
+            report['unmatched'].append(tx)
+            continue
+
+        tx_date  = parse_date(tx.get('date'))
+        odometer = parse_number(tx.get('odometer'))
+        gallons  = parse_number(tx.get('gallons'))
+        cost     = parse_number(tx.get('total_cost'))
+        if tx_date is None or not odometer or not gallons or cost is None:
+            report['invalid'].append({**tx, 'reason': 'missing date, odometer, gallons or cost'})
+            continue
+        if gallons < 0 or cost < 0 or odometer < 0:
+            # Reversal / credit lines: not a fill, and would log negative MPG
+            report['invalid'].append({**tx, 'reason': 'negative gallons, cost or odometer (reversal or credit)'})
+            continue
+
+        matched[vehicle_id].append((tx_date, int(odometer), gallons, cost, tx))
+
+    if not matched:
+        return report
+
+    # 2) Chain statement transactions and known readings (hot and archived) per
+    #    vehicle in (date, odometer) order; at a tie the reading on file comes first
+    all_dates = [t[0] for txs in matched.values() for t in txs]
+    existing = _existing_keys(min(all_dates), max(all_dates))
+    seeds, timeline = _known_readings(set(matched), min(all_dates))
+
+    rows, relinked = [], []
+    for vehicle_id, txs in matched.items():
+        merged = timeline[vehicle_id] + [(d, od, None, (gal, cost, tx)) for d, od, gal, cost, tx in txs]
+        merged.sort(key=lambda t: (t[0], t[1]))
+        # odometer of the next reading on file after each position, for the upper bound
+        next_known, upper = [None] * len(merged), None
+        for i in range(len(merged) - 1, -1, -1):
+            next_known[i] = upper
+            if merged[i][2] is not None:
+                upper = merged[i][1]
+
+        last_od = seeds.get(vehicle_id)
+        inserted_before = False
+        for (tx_date, curr_od, log_id, new), later_od in zip(merged, next_known):
+            if new is None:
+                # Reading on file: if a statement fill now sits just before it,
+                # its last_od has to point at that fill instead (hot rows only;
+                # the archive is left as it was archived)
+                if inserted_before and log_id is not None:
+                    relinked.append({'id': log_id, 'last_od': last_od})
+                last_od, inserted_before = curr_od, False
+                continue
+
+            gallons, cost, tx = new
+            key = (vehicle_id, tx_date, curr_od, round(gallons, 3), round(cost, 2))
+            if key in existing:
+                report['duplicates'].append(tx)
+                continue
+            existing.add(key)
+
+            if last_od is not None and curr_od < last_od:
+                report['invalid'].append({**tx, 'reason': f'odometer {curr_od} is below previous reading {last_od}'})
+                continue
+            if later_od is not None and curr_od > later_od:
+                report['invalid'].append({**tx, 'reason': f'odometer {curr_od} is above later reading {later_od}'})
+                continue
+
+            rows.append({
+                'vehicle_id': vehicle_id,
+                'date':       tx_date,
+                'last_od':    curr_od if last_od is None else last_od,
+                'curr_od':    curr_od,
+                'gallons':    gallons,
+                'total_cost': cost,
+            })
+            last_od, inserted_before = curr_od, True
+
+    # 3) Bulk insert
+    if rows:
+        db.session.execute(insert(FuelLog), rows)
+        events.record(db.session, 'insert', FuelLog.__tablename__)
+        if relinked:
+            db.session.execute(update(FuelLog), relinked)
+            events.record(db.session, 'update', FuelLog.__tablename__)
+        if commit:
+            db.session.commit()
+    report['inserted'] = len(rows)
+    report['relinked'] = len(relinked)
+    return report
+
+def reconcile_file(path, commit=True):
+    """Read a statement file and reconcile it; see reconcile_statement()."""
+    return reconcile_statement(read_statement(path), commit=commit)
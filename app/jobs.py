@@ -0,0 +1,247 @@
+# app/jobs.py
+# Persistent background job queue.
+# Jobs live in the app's own database (job table); `flask fleet worker`
+# claims them one at a time, runs the registered handler, and records the
+# outcome. Handlers are registered in app/tasks.py.
+
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.exc import OperationalError
+
+from .models import Job
+from . import db
+
+HANDLERS = {}
+
+def handler(kind):
+    """Register fn(ctx, **payload) as the handler for jobs of this kind."""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+def enqueue(kind, payload=None, priority=0, max_attempts=3, delay=0, created_by=None, commit=True):
+    """
+    Queue a job and return it.
+    - priority:     higher runs first
+    - max_attempts: total tries before the job is marked failed
+    - delay:        seconds before the job may start
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay),
+        created_by=created_by,
+    )
+    db.session.add(job)
+    if commit:
+        db.session.commit()
+    return job
+
+def backoff_seconds(attempts, base, cap):
+    """Exponential backoff with jitter: base, 2×base, 4×base … capped, ±20%."""
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap)
+    return delay * random.uniform(0.8, 1.2)
+
+# ────────────────────────────────────────────────────────────────────────────────
+class JobContext:
+    """
+    Handed to every handler as its first argument:
+    - job_id / attempt for logging
+    - progress(fraction, message) to report progress on the status page
+    Progress is written on its own connection so it shows up while the handler's
+    transaction is still open; report it between commits, not mid-transaction,
+    or SQLite's single writer lock will make it wait.
+    """
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.attempt = job.attempts
+        self.payload = dict(job.payload or {})
+
+    def progress(self, fraction, message=None):
+        values = {'progress': max(0.0, min(float(fraction), 1.0)) * 100,
+                  'heartbeat_at': datetime.utcnow()}
+        if message is not None:
+            values['message'] = message[:255]
+        with db.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.id == self.job_id).values(**values))
+
+class Heartbeat(threading.Thread):
+    """
+    Keeps a running job's heartbeat_at fresh every `interval` seconds for as long
+    as its handler runs, so a long handler that never reports progress is not
+    taken for a dead worker and re-queued under it.
+    Beats use their own connection; while the handler holds SQLite's write lock
+    (e.g. a full VACUUM) a beat waits out the busy timeout or is skipped, and the
+    next one catches up. Keep FLEET_JOB_STALE_SECONDS well above both.
+    """
+
+    def __init__(self, engine, job_id, worker_id, interval):
+        super().__init__(name=f'fleet-job-{job_id}-heartbeat', daemon=True)
+        self.engine = engine
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(Job)
+                        .where(Job.id == self.job_id, Job.status == 'running',
+                               Job.worker == self.worker_id)
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+            except OperationalError:
+                pass    # database locked; try again next beat
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+# ────────────────────────────────────────────────────────────────────────────────
+def claim_next(worker_id):
+    """
+    Atomically claim the next runnable job for this worker, or return None.
+    The conditional UPDATE makes two workers racing for one job safe.
+    """
+    while True:
+        now = datetime.utcnow()
+        job_id = db.session.execute(
+            select(Job.id)
+            .where(Job.status == 'queued', Job.run_after <= now)
+            .order_by(Job.priority.desc(), Job.id)
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', worker=worker_id, attempts=Job.attempts + 1,
+                    started_at=now, heartbeat_at=now, finished_at=None)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+
+def requeue_stale(stale_after):
+    """
+    Put back jobs whose worker stopped heart-beating (crashed or killed).
+    A job that has used up its attempts is marked failed instead, so a job
+    that keeps killing its worker (OOM, SIGKILL) is not re-claimed forever.
+    Returns the number of jobs re-queued or failed.
+    """
+    now = datetime.utcnow()
+    stale = and_(Job.status == 'running', Job.heartbeat_at < now - timedelta(seconds=stale_after))
+    failed = db.session.execute(
+        update(Job)
+        .where(stale, Job.attempts >= Job.max_attempts)
+        .values(status='failed', worker=None, finished_at=now,
+                message='Worker stopped responding; no attempts left')
+    ).rowcount
+    requeued = db.session.execute(
+        update(Job)
+        .where(stale)
+        .values(status='queued', worker=None, message='Re-queued after worker timeout')
+    ).rowcount
+    db.session.commit()
+    return failed + requeued
+
+def run_job(job, backoff_base=30, backoff_cap=3600, heartbeat_interval=60):
+    """
+    Run one claimed job and record the result.
+    A Heartbeat thread keeps the job alive for the whole run.
+    On failure the job is re-queued with backoff, or marked failed once it
+    has used up max_attempts.
+    """
+    fn = HANDLERS.get(job.kind)
+    ctx = JobContext(job)
+    heartbeat = Heartbeat(db.engine, job.id, job.worker, heartbeat_interval)
+    heartbeat.start()
+    try:
+        if fn is None:
+            raise LookupError(f'No handler registered for {job.kind!r}')
+        result = fn(ctx, **ctx.payload)
+        db.session.commit()
+    except Exception:
+        heartbeat.stop()
+        db.session.rollback()
+        job = db.session.get(Job, ctx.job_id)
+        job.last_error = traceback.format_exc()[-4000:]
+        if job.attempts < job.max_attempts:
+            delay = backoff_seconds(job.attempts, backoff_base, backoff_cap)
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            job.message = f'Attempt {job.attempts} failed; retrying in {int(delay)}s'
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            job.message = f'Failed after {job.attempts} attempts'
+        job.worker = None
+        db.session.commit()
+        return job
+
+    heartbeat.stop()
+    job = db.session.get(Job, ctx.job_id)
+    job.status = 'succeeded'
+    job.progress = 100
+    job.message = None      # drop the last progress note, e.g. 'Reclaiming space'
+    job.result = result
+    job.finished_at = datetime.utcnow()
+    job.worker = None
+    db.session.commit()
+    return job
+
+def work(app, poll_interval=2.0, once=False, log=print):
+    """
+    Worker loop: claim and run jobs until interrupted.
+    With once=True, drain the runnable jobs and return.
+    A locked database (another process vacuuming or committing a large batch
+    past the busy timeout) is waited out rather than crashing the worker; a job
+    caught mid-bookkeeping is picked up again by the stale sweep.
+    """
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    cfg = app.config
+    last_sweep = 0.0
+    while True:
+        try:
+            if time.monotonic() - last_sweep > cfg['FLEET_JOB_STALE_SECONDS'] / 2:
+                requeued = requeue_stale(cfg['FLEET_JOB_STALE_SECONDS'])
+                if requeued:
+                    log(f'Re-queued or failed {requeued} stale job(s)')
+                last_sweep = time.monotonic()
+
+            job = claim_next(worker_id)
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            log(f'Job {job.id} {job.kind} (attempt {job.attempts}/{job.max_attempts}) started')
+            job = run_job(job, cfg['FLEET_JOB_BACKOFF_SECONDS'], cfg['FLEET_JOB_BACKOFF_CAP_SECONDS'],
+                          cfg['FLEET_JOB_HEARTBEAT_SECONDS'])
+            log(f'Job {job.id} {job.kind} {job.status}' + (f': {job.message}' if job.message else ''))
+        except OperationalError as exc:
+            db.session.rollback()
+            log(f'Database unavailable ({exc.orig}); retrying in {poll_interval}s')
+            time.sleep(poll_interval)
+        finally:
+            db.session.remove()
@@ -0,0 +1,243 @@
+# app/kpi.py
+# Materialized fleet KPIs for the dashboard.
+# The figures are computed with a handful of aggregate queries and stored in
+# the fleet_kpi table; the dashboard only ever reads that snapshot.
+# Staleness is tracked through table_version: every write to a watched table,
+# from any process, bumps its counter, and the snapshot records the sum of
+# those counters it was built from.
+
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import case, delete, func, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .models import Vehicle, WorkOrder, FuelLog, MaintenanceLog, FleetKpi, TableVersion
+from .archive import fuel_union
+from .routing import routed
+from . import db, events
+
+# Tables whose writes make the snapshot stale
+WATCHED_TABLES = {
+    Vehicle.__tablename__,
+    WorkOrder.__tablename__,
+    FuelLog.__tablename__,
+    MaintenanceLog.__tablename__,
+}
+for _table in WATCHED_TABLES:
+    events.versioned(_table)
+
+# table_version row holding the watched stamp the current snapshot was built from
+SNAPSHOT_STAMP = FleetKpi.__tablename__
+
+# Fleetmate flag values that mean "yes"
+TRUE_FLAGS = ('1', 't', 'true', 'y', 'yes')
+
+# ────────────────────────────────────────────────────────────────────────────────
+def compute_kpis(today=None):
+    """
+    Run the aggregate queries (on the report pool) and return the snapshot as
+    a list of dicts (key, group, label, value), ready to bulk-insert into fleet_kpi.
+    """
+    with routed('report'):
+        return _compute_kpis(today)
+
+def _compute_kpis(today):
+    today = today or date.today()
+    month_start = today.replace(day=1)
+    rows = []
+
+    def add(key, group, label, value):
+        rows.append({'key': key, 'group': group, 'label': label, 'value': float(value or 0)})
+
+    # 1) Vehicle totals, out-of-service and overdue renewals in one pass
+    out_of_service = func.lower(Vehicle.data['FL_OUTOFSERVICE'].as_string()).in_(TRUE_FLAGS)
+    overdue = or_(
+        Vehicle.registration_exp < today,
+        Vehicle.inspection_exp < today,
+        Vehicle.insurance_exp < today,
+    )
+    total, oos, overdue_count, reg, insp, ins = db.session.execute(
+        select(
+            func.count(Vehicle.id),
+            func.sum(case((out_of_service, 1), else_=0)),
+            func.sum(case((overdue, 1), else_=0)),
+            func.sum(case((Vehicle.registration_exp < today, 1), else_=0)),
+            func.sum(case((Vehicle.inspection_exp < today, 1), else_=0)),
+            func.sum(case((Vehicle.insurance_exp < today, 1), else_=0)),
+        )
+    ).one()
+    add('vehicles', 'summary', 'Vehicles', total)
+    add('out_of_service', 'summary', 'Out of service', oos)
+    add('overdue_renewals', 'summary', 'Vehicles with overdue renewals', overdue_count)
+    add('overdue:registration', 'renewals', 'Registration', reg)
+    add('overdue:inspection', 'renewals', 'Inspection', insp)
+    add('overdue:insurance', 'renewals', 'Insurance', ins)
+
+    # 2) Vehicle counts by department and by type. NULL, '' and whitespace-only
+    #    all group as Unassigned; counts are merged per label because
+    #    fleet_kpi.key is unique (a department literally named 'Unassigned' too)
+    for column, group in ((Vehicle.department, 'department'), (Vehicle.type, 'type')):
+        value = func.nullif(func.trim(column), '')
+        merged = {}
+        for name, count in db.session.execute(
+            select(value, func.count(Vehicle.id)).group_by(value)
+        ):
+            label = name or 'Unassigned'
+            merged[label] = merged.get(label, 0) + count
+        for label, count in merged.items():
+            add(f'{group}:{label}', group, label, count)
+
+    # 3) Month-to-date fuel spend (archive folded in, in case the cutoff is recent)
+    fuel = fuel_union('date', 'total_cost', 'gallons')
+    spend, gallons = db.session.execute(
+        select(func.sum(fuel.c.total_cost), func.sum(fuel.c.gallons))
+        .where(fuel.c.date >= month_start)
+    ).one()
+    add('fuel_spend_mtd', 'summary', 'Fuel spend (month to date)', spend)
+    add('fuel_gallons_mtd', 'summary', 'Gallons (month to date)', gallons)
+
+    # 4) Open work orders
+    open_orders = db.session.execute(
+        select(func.count(WorkOrder.id)).where(WorkOrder.status != 'completed')
+    ).scalar()
+    add('open_work_orders', 'summary', 'Open work orders', open_orders)
+
+    return rows
+
+def watched_stamp():
+    """Sum of the watched tables' table_version counters; changes on any write to them."""
+    return db.session.execute(
+        select(func.coalesce(func.sum(TableVersion.version), 0))
+        .where(TableVersion.name.in_(WATCHED_TABLES))
+    ).scalar()
+
+def snapshot_state():
+    """(stamp the snapshot was built from, when it was refreshed); None for either if unknown."""
+    stamp = db.session.execute(
+        select(TableVersion.version).where(TableVersion.name == SNAPSHOT_STAMP)
+    ).scalar()
+    refreshed_at = db.session.execute(select(func.min(FleetKpi.refreshed_at))).scalar()
+    return stamp, refreshed_at
+
+def refresh_kpis(today=None, max_age=None):
+    """
+    Recompute the KPIs and replace the snapshot in one transaction.
+    With max_age (seconds), skip the work when the snapshot was built from the
+    current watched stamp and is younger than max_age, e.g. because another
+    refresher got there first. Returns refreshed_at, or None if skipped.
+    """
+    stamp = watched_stamp()
+    if max_age is not None:
+        built_from, refreshed_at = snapshot_state()
+        if (built_from == stamp and refreshed_at
+                and (datetime.utcnow() - refreshed_at).total_seconds() < max_age):
+            db.session.rollback()
+            return None
+
+    rows = compute_kpis(today)
+    refreshed_at = datetime.utcnow()
+    for row in rows:
+        row['refreshed_at'] = refreshed_at
+
+    db.session.execute(delete(FleetKpi))
+    db.session.execute(insert(FleetKpi), rows)
+    db.session.execute(
+        sqlite_insert(TableVersion)
+        .values(name=SNAPSHOT_STAMP, version=stamp)
+        .on_conflict_do_update(index_elements=['name'], set_={'version': stamp})
+    )
+    db.session.commit()
+    return refreshed_at
+
+def load_snapshot():
+    """
+    Read the whole snapshot in a single query.
+    Returns (rows grouped by KPI group, refreshed_at or None if never computed).
+    """
+    grouped = {}
+    refreshed_at = None
+    for kpi in FleetKpi.query.order_by(FleetKpi.group, FleetKpi.id).all():
+        grouped.setdefault(kpi.group, []).append(kpi)
+        if refreshed_at is None or kpi.refreshed_at < refreshed_at:
+            refreshed_at = kpi.refreshed_at
+    return grouped, refreshed_at
+
+# ────────────────────────────────────────────────────────────────────────────────
+class KpiScheduler(threading.Thread):
+    """
+    Background thread that keeps the snapshot fresh:
+    - every `poll` seconds, refreshes if the watched stamp moved (a write in
+      any process) or the snapshot is older than `interval` (date-based KPIs)
+    - refreshes early when poke()d by a write event in this process, after
+      waiting `debounce` seconds so a burst of writes costs one refresh
+    Runs in the job worker by default (FLEET_KPI_SCHEDULER='worker'), so one
+    thread serves every web process; several refreshers stay safe because
+    each skips a snapshot that is already current.
+    """
+
+    def __init__(self, app, interval, debounce, poll):
+        super().__init__(name='fleet-kpi-scheduler', daemon=True)
+        self.app = app
+        self.interval = interval
+        self.debounce = debounce
+        self.poll = poll
+        self._wake = threading.Event()
+
+    def poke(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    refresh_kpis(max_age=self.interval)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('KPI snapshot refresh failed')
+                finally:
+                    db.session.remove()
+
+            if self._wake.wait(self.poll):
+                time.sleep(self.debounce)
+                self._wake.clear()
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+@events.subscribe
+def _on_commit(changes):
+    """Refresh early when this process wrote a watched table."""
+    if _scheduler and any(c.table in WATCHED_TABLES for c in changes):
+        _scheduler.poke()
+
+def start_scheduler(app):
+    """Start this process's scheduler if it is not already running."""
+    global _scheduler
+    if _scheduler:
+        return
+    with _scheduler_lock:
+        if _scheduler:
+            return
+        _scheduler = KpiScheduler(
+            app,
+            interval=app.config['FLEET_KPI_REFRESH_SECONDS'],
+            debounce=app.config['FLEET_KPI_DEBOUNCE_SECONDS'],
+            poll=app.config['FLEET_KPI_POLL_SECONDS'],
+        )
+        _scheduler.start()
+
+def init_app(app):
+    """
+    Hook the scheduler into the app according to FLEET_KPI_SCHEDULER:
+    - 'worker': `flask fleet worker` starts it (see app/commands.py)
+    - 'web':    each web process starts its own on the first request, not at
+                import time, so CLI commands never spawn it
+    """
+    if app.config.get('FLEET_KPI_SCHEDULER') != 'web':
+        return
+
+    @app.before_request
+    def _ensure_scheduler():
+        start_scheduler(app)
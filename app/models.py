@@ -73,6 +73,22 @@ class Vehicle(db.Model):
         lazy='dynamic'
     )
 
+    # Archived history (attached archive database, see app.archive)
+    archived_fuel_logs = db.relationship(
+        'ArchivedFuelLog',
+        backref='vehicle',
+        cascade='all, delete-orphan',
+        lazy='dynamic',
+        order_by="ArchivedFuelLog.date.desc()"
+    )
+
+    archived_maintenance_logs = db.relationship(
+        'ArchivedMaintenanceLog',
+        backref='vehicle',
+        cascade='all, delete-orphan',
+        lazy='dynamic'
+    )
+
     def __repr__(self):
         return f'<Vehicle {self.unit_no or self.id}: {self.make} {self.model}>'
 
@@ -82,14 +98,22 @@ class WorkOrder(db.Model):
     WorkOrder model:
     - Linked to vehicle
     - Supports text description and optional file
+    - Status follows the dashboard tabs: pending → in-progress → completed
     """
     __tablename__ = 'work_order'
 
+    STATUSES = ('pending', 'in-progress', 'completed')
+
     id                  = db.Column(db.Integer, primary_key=True)
     vehicle_id          = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
     description         = db.Column(db.Text, nullable=False)
     date                = db.Column(db.Date, nullable=False, default=date.today)
     attachment_filename = db.Column(db.String(255), nullable=True)
+    status              = db.Column(db.String(20), nullable=False, default='pending')
+
+    @property
+    def is_open(self):
+        return self.status != 'completed'
 
     def __repr__(self):
         return f'<WorkOrder {self.id} for Vehicle {self.vehicle_id}>'
@@ -99,8 +123,14 @@ class FuelLog(db.Model):
     """
     FuelLog model:
     - Tracks odometer, gallons, cost, and calculates MPG & $/gallon
+    - Indexed per vehicle by date (history pages) and by date alone
+      (statement reconciliation, month-to-date rollups, archiving)
     """
     __tablename__ = 'fuel_log'
+    __table_args__ = (
+        db.Index('ix_fuel_log_vehicle_date', 'vehicle_id', 'date'),
+        db.Index('ix_fuel_log_date', 'date'),
+    )
 
     id           = db.Column(db.Integer, primary_key=True)
     vehicle_id   = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
@@ -128,8 +158,13 @@ class MaintenanceLog(db.Model):
     MaintenanceLog model:
     - Linked to a vehicle
     - Tracks date, service type, notes, and cost
+    - Indexed like FuelLog: per vehicle by service date, and by service date
     """
     __tablename__ = 'maintenance_log'
+    __table_args__ = (
+        db.Index('ix_maintenance_log_vehicle_date', 'vehicle_id', 'service_date'),
+        db.Index('ix_maintenance_log_service_date', 'service_date'),
+    )
 
     id           = db.Column(db.Integer, primary_key=True)
     vehicle_id   = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
@@ -141,6 +176,157 @@ class MaintenanceLog(db.Model):
     def __repr__(self):
         return f'<MaintenanceLog {self.service_date} for Vehicle {self.vehicle_id}>'
 
+# ────────────────────────────────────────────────────────────────────────────────
+class ArchivedFuelLog(db.Model):
+    """
+    ArchivedFuelLog model:
+    - Same columns as FuelLog, stored in the attached archive database
+    - Rows are moved here by app.archive once they pass the retention cutoff
+    - Keeps the FuelLog id, so archiving a row twice is a no-op
+    """
+    __tablename__ = 'fuel_log'
+    __table_args__ = {'schema': 'archive'}
+
+    id           = db.Column(db.Integer, primary_key=True)
+    vehicle_id   = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False, index=True)
+    date         = db.Column(db.Date, nullable=False)
+    last_od      = db.Column(db.Integer, nullable=False)
+    curr_od      = db.Column(db.Integer, nullable=False)
+    gallons      = db.Column(db.Float, nullable=False)
+    total_cost   = db.Column(db.Float, nullable=False)
+    archived_at  = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    cost_per_gallon = FuelLog.cost_per_gallon
+    mpg             = FuelLog.mpg
+
+    def __repr__(self):
+        return f'<ArchivedFuelLog {self.date} for Vehicle {self.vehicle_id}>'
+
+# ────────────────────────────────────────────────────────────────────────────────
+class ArchivedMaintenanceLog(db.Model):
+    """
+    ArchivedMaintenanceLog model:
+    - Same columns as MaintenanceLog, stored in the attached archive database
+    - Keeps the MaintenanceLog id, like ArchivedFuelLog
+    """
+    __tablename__ = 'maintenance_log'
+    __table_args__ = {'schema': 'archive'}
+
+    id           = db.Column(db.Integer, primary_key=True)
+    vehicle_id   = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False, index=True)
+    service_date = db.Column(db.Date, nullable=False)
+    service_type = db.Column(db.String(100), nullable=False)
+    notes        = db.Column(db.Text)
+    cost         = db.Column(db.Float)
+    archived_at  = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ArchivedMaintenanceLog {self.service_date} for Vehicle {self.vehicle_id}>'
+
+# ────────────────────────────────────────────────────────────────────────────────
+class FleetKpi(db.Model):
+    """
+    FleetKpi model:
+    - One row per dashboard figure in the materialized KPI snapshot
+    - Rebuilt as a whole by app.kpi.refresh_kpis(); never edited in place
+    - refreshed_at tells the dashboard how stale the snapshot is
+    """
+    __tablename__ = 'fleet_kpi'
+
+    id           = db.Column(db.Integer, primary_key=True)
+    key          = db.Column(db.String(150), unique=True, nullable=False)
+    group        = db.Column(db.String(50), nullable=False, default='summary')
+    label        = db.Column(db.String(150), nullable=False)
+    value        = db.Column(db.Float, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FleetKpi {self.key}={self.value}>'
+
+# ────────────────────────────────────────────────────────────────────────────────
+class VehicleForecast(db.Model):
+    """
+    VehicleForecast model:
+    - One row per vehicle, written by the nightly app.forecast job
+    - Projected replacement date (and which threshold drives it)
+    - Cost to date and projected total cost of ownership
+    """
+    __tablename__ = 'vehicle_forecast'
+
+    vehicle_id         = db.Column(db.Integer, db.ForeignKey('vehicle.id'), primary_key=True)
+    current_odometer   = db.Column(db.Integer, nullable=True)
+    miles_per_day      = db.Column(db.Float, nullable=True)
+    replacement_date   = db.Column(db.Date, nullable=True, index=True)
+    replacement_basis  = db.Column(db.String(20), nullable=True)   # date / meter / hours
+    purchase_price     = db.Column(db.Float, nullable=False, default=0)
+    fuel_cost          = db.Column(db.Float, nullable=False, default=0)
+    maintenance_cost   = db.Column(db.Float, nullable=False, default=0)
+    projected_cost     = db.Column(db.Float, nullable=False, default=0)
+    total_cost         = db.Column(db.Float, nullable=False, default=0, index=True)
+    cost_per_mile      = db.Column(db.Float, nullable=True)
+    computed_at        = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    vehicle = db.relationship('Vehicle', backref=db.backref('forecast', uselist=False, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<VehicleForecast {self.vehicle_id}: {self.replacement_date}>'
+
+# ────────────────────────────────────────────────────────────────────────────────
+class Job(db.Model):
+    """
+    Job model:
+    - Background work queued by the web app and run by `flask fleet worker`
+    - Claimed highest priority first, then oldest first
+    - Failed attempts are re-queued with exponential backoff until max_attempts
+    """
+    __tablename__ = 'job'
+    __table_args__ = (db.Index('ix_job_claim', 'status', 'priority', 'run_after'),)
+
+    STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+    id            = db.Column(db.Integer, primary_key=True)
+    kind          = db.Column(db.String(50), nullable=False)
+    payload       = db.Column(JSON, nullable=False, default=dict)
+    status        = db.Column(db.String(20), nullable=False, default='queued')
+    priority      = db.Column(db.Integer, nullable=False, default=0)
+    attempts      = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts  = db.Column(db.Integer, nullable=False, default=3)
+    run_after     = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    progress      = db.Column(db.Float, nullable=False, default=0)
+    message       = db.Column(db.String(255), nullable=True)
+    result        = db.Column(JSON, nullable=True)
+    last_error    = db.Column(db.Text, nullable=True)
+    worker        = db.Column(db.String(100), nullable=True)
+    heartbeat_at  = db.Column(db.DateTime, nullable=True)
+    created_by    = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at    = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at    = db.Column(db.DateTime, nullable=True)
+    finished_at   = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} ({self.status})>'
+
+# ────────────────────────────────────────────────────────────────────────────────
+class TableVersion(db.Model):
+    """
+    TableVersion model:
+    - One counter per table registered with app.events.versioned()
+    - Bumped in the writing transaction on every flush or bulk write that
+      touches the table, from any process (web workers, job worker, CLI)
+    - Lets per-process caches notice writes made elsewhere with one cheap read
+    """
+    __tablename__ = 'table_version'
+
+    name    = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TableVersion {self.name} v{self.version}>'
+
 # ────────────────────────────────────────────────────────────────────────────────
 class User(UserMixin, db.Model):
     """
@@ -0,0 +1,91 @@
+# app/notifications.py
+# Renewal reminder digests for the Fleetmate FL_EMAILNOTIFY / TX_EMAILNOTIFY fields.
+# One email per recipient lists every vehicle of theirs with a renewal due,
+# instead of one email per vehicle.
+
+import re
+import smtplib
+from collections import defaultdict
+from datetime import date, timedelta
+from email.message import EmailMessage
+
+from flask import current_app
+from sqlalchemy import or_, select
+
+from .models import Vehicle
+from .kpi import TRUE_FLAGS
+from . import db
+
+RENEWALS = (
+    ('registration_exp', 'Registration'),
+    ('inspection_exp', 'Inspection'),
+    ('insurance_exp', 'Insurance'),
+)
+
+def _recipients(value):
+    """TX_EMAILNOTIFY may hold several addresses separated by commas or semicolons."""
+    return [a.strip() for a in re.split(r'[;,]', value or '') if '@' in a]
+
+def build_digests(today=None, notice_days=30):
+    """
+    Collect renewals that are overdue or due within notice_days for vehicles
+    with FL_EMAILNOTIFY set. Returns {address: [(unit_no, make, model, renewal, due)]}.
+    """
+    today = today or date.today()
+    horizon = today + timedelta(days=notice_days)
+    notify = Vehicle.data['FL_EMAILNOTIFY'].as_string()
+    address = Vehicle.data['TX_EMAILNOTIFY'].as_string()
+
+    rows = db.session.execute(
+        select(
+            Vehicle.unit_no, Vehicle.make, Vehicle.model, address,
+            *(getattr(Vehicle, col) for col, _ in RENEWALS),
+        ).where(
+            db.func.lower(notify).in_(TRUE_FLAGS),
+            or_(*(getattr(Vehicle, col) <= horizon for col, _ in RENEWALS)),
+        )
+    )
+
+    digests = defaultdict(list)
+    for unit_no, make, model, to, *dates in rows:
+        for (_, label), due in zip(RENEWALS, dates):
+            if due and due <= horizon:
+                for addr in _recipients(to):
+                    digests[addr].append((unit_no, make, model, label, due))
+    for items in digests.values():
+        items.sort(key=lambda item: item[4])
+    return dict(digests)
+
+def render_digest(items, today=None):
+    """Plain-text body for one recipient's digest."""
+    today = today or date.today()
+    lines = ['The following fleet renewals are overdue or coming due:', '']
+    for unit_no, make, model, label, due in items:
+        state = 'OVERDUE' if due < today else f'due in {(due - today).days} days'
+        lines.append(f'  Unit {unit_no or "?"} ({make or ""} {model or ""}): {label} {due.isoformat()} — {state}')
+    lines += ['', f'{len(items)} renewal(s) in total.']
+    return '\n'.join(lines)
+
+def send_email(to, subject, body):
+    """
+    Send one plain-text email via the MAIL_* settings.
+    Without MAIL_SERVER the message is only logged (development).
+    """
+    cfg = current_app.config
+    if not cfg.get('MAIL_SERVER'):
+        current_app.logger.info('MAIL_SERVER not set; would send to %s: %s\n%s', to, subject, body)
+        return False
+
+    msg = EmailMessage()
+    msg['From'] = cfg['MAIL_DEFAULT_SENDER']
+    msg['To'] = to
+    msg['Subject'] = subject
+    msg.set_content(body)
+
+    with smtplib.SMTP(cfg['MAIL_SERVER'], cfg['MAIL_PORT'], timeout=30) as smtp:
+        if cfg.get('MAIL_USE_TLS'):
+            smtp.starttls()
+        if cfg.get('MAIL_USERNAME'):
+            smtp.login(cfg['MAIL_USERNAME'], cfg['MAIL_PASSWORD'])
+        smtp.send_message(msg)
+    return True
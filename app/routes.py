@@ -1,6 +1,7 @@
 # app/routes.py
 
 import os
+from datetime import date, datetime, timedelta
 from flask import (
     Blueprint,
     render_template,
@@ -8,14 +9,22 @@ from flask import (
     redirect,
     url_for,
     flash,
-    current_app
+    current_app,
+    jsonify,
+    abort
 )
 from werkzeug.utils import secure_filename
 from flask_login import login_required, current_user
 from sqlalchemy import or_, cast
 from sqlalchemy.types import Integer
 
-from .models import Vehicle, WorkOrder, FuelLog  # FuelLog imported so we can query fuel log entries
+from .models import Vehicle, WorkOrder, FuelLog, VehicleForecast, Job  # FuelLog imported so we can query fuel log entries
+from .kpi import load_snapshot
+from .directory import suggest
+from .archive import fuel_history, maintenance_history
+from .jobs import enqueue
+from .tasks import PRIORITY_INTERACTIVE, PRIORITY_IMPORT
+from .routing import uses_route
 from . import db
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -41,7 +50,7 @@ def home():
     """
     Home page:
       - GET parameters:
-          q    = optional search term (make, model, or unit number)
+          q    = optional search term (make, model, unit number or VIN)
           page = page number for pagination
       - Renders 'vehicles.html' with:
           vehicles         = list of Vehicle objects for the current page
@@ -61,7 +70,8 @@ def home():
             or_(
                 Vehicle.make.ilike(f'%{q}%'),
                 Vehicle.model.ilike(f'%{q}%'),
-                Vehicle.unit_no.ilike(f'%{q}%')
+                Vehicle.unit_no.ilike(f'%{q}%'),
+                Vehicle.vin.ilike(f'%{q}%')
             )
         )
 
@@ -76,8 +86,8 @@ def home():
     # 4) Pick the first vehicle as the “current” one (or None if list is empty)
     current_vehicle = vehicles[0] if vehicles else None
 
-    # 5) Load its fuel-log entries via the Vehicle.fuel_logs relationship
-    fuel_logs = current_vehicle.fuel_logs.all() if current_vehicle else []
+    # 5) Load its fuel-log entries, including archived history
+    fuel_logs = fuel_history(current_vehicle.id) if current_vehicle else []
 
     # 6) Render the template with all the data
     return render_template(
@@ -89,14 +99,106 @@ def home():
         fuel_logs=fuel_logs
     )
 
+# ────────────────────────────────────────────────────────────────────────────────
+@main.route('/vehicles/suggest')
+@login_required
+def vehicle_suggest():
+    """
+    Typeahead lookup:
+      - GET parameters:
+          q     = partial unit number, VIN prefix/suffix, make or model
+          limit = max results (default 10, clamped to 1..50)
+      - Returns JSON list of {id, unit_no, vin, make, model, url}
+      - Served from the in-memory directory (app.directory); the database
+        only answers its staleness check
+    """
+    q = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    return jsonify([
+        {**entry.to_dict(), 'url': url_for('main.vehicle_detail', vehicle_id=entry.id)}
+        for entry in suggest(q, limit)
+    ])
+
+# ────────────────────────────────────────────────────────────────────────────────
+@main.route('/dashboard')
+@login_required
+def dashboard():
+    """
+    Fleet KPI dashboard:
+      - Renders 'index.html' from the materialized KPI snapshot (one query)
+      - kpis         = dict of KPI group → list of FleetKpi rows
+      - refreshed_at = when the snapshot was computed (None if not yet built)
+    """
+    kpis, refreshed_at = load_snapshot()
+    return render_template('index.html', kpis=kpis, refreshed_at=refreshed_at)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Sortable columns on the forecast report (query param → column)
+FORECAST_SORTS = {
+    'unit_no':     Vehicle.unit_no,
+    'department':  Vehicle.department,
+    'replacement': VehicleForecast.replacement_date,
+    'odometer':    VehicleForecast.current_odometer,
+    'total_cost':  VehicleForecast.total_cost,
+    'cost_mile':   VehicleForecast.cost_per_mile,
+}
+
+@main.route('/reports/forecast')
+@login_required
+@uses_route('report')
+def forecast_report():
+    """
+    Replacement forecast report:
+      - GET parameters:
+          sort       = one of FORECAST_SORTS (default: replacement)
+          dir        = asc / desc
+          department = exact department filter
+          basis      = date / meter / hours
+          due        = only vehicles due for replacement within this many days
+          page       = page number for pagination
+      - Renders 'forecast.html' from the vehicle_forecast table
+    """
+    sort = request.args.get('sort', 'replacement')
+    direction = request.args.get('dir', 'asc')
+    department = request.args.get('department', '').strip()
+    basis = request.args.get('basis', '').strip()
+    due = request.args.get('due', type=int)
+    page = request.args.get('page', 1, type=int)
+
+    query = db.session.query(VehicleForecast, Vehicle).join(Vehicle)
+    if department:
+        query = query.filter(Vehicle.department == department)
+    if basis:
+        query = query.filter(VehicleForecast.replacement_basis == basis)
+    if due is not None:
+        query = query.filter(VehicleForecast.replacement_date <= date.today() + timedelta(days=due))
+
+    column = FORECAST_SORTS.get(sort, VehicleForecast.replacement_date)
+    order = column.desc() if direction == 'desc' else column.asc()
+    pagination = query.order_by(column.is_(None), order).paginate(page=page, per_page=50, error_out=False)
+
+    departments = [
+        d for (d,) in db.session.query(Vehicle.department).distinct().order_by(Vehicle.department) if d
+    ]
+    return render_template(
+        'forecast.html',
+        pagination=pagination,
+        departments=departments,
+        args=request.args,
+        sort=sort,
+        direction=direction
+    )
+
 # ────────────────────────────────────────────────────────────────────────────────
 @main.route('/vehicle/<int:vehicle_id>', methods=['GET', 'POST'])
 @login_required
 def vehicle_detail(vehicle_id):
     """
     Vehicle detail page:
-      - GET: show vehicle info, current mileage form, list of work orders
-      - POST: either update mileage, or add a new work order with optional attachment
+      - GET: show vehicle info, current mileage form, list of work orders,
+             fuel and maintenance history (archived rows included)
+      - POST: update mileage, add a new work order with optional attachment,
+              or move an existing work order to another status
     """
     v = Vehicle.query.get_or_404(vehicle_id)
 
@@ -120,19 +222,35 @@ def vehicle_detail(vehicle_id):
                     os.path.join(current_app.config['UPLOAD_FOLDER'], attach_fn)
                 )
 
+            status = request.form.get('status', 'pending')
             wo = WorkOrder(
                 vehicle_id=vehicle_id,
                 description=desc,
-                attachment_filename=attach_fn
+                attachment_filename=attach_fn,
+                status=status if status in WorkOrder.STATUSES else 'pending'
             )
             db.session.add(wo)
             db.session.commit()
             flash('Work order added.', 'success')
 
+        # ----- Work order status change ----- #
+        elif 'work_order_id' in request.form:
+            wo = v.work_orders.filter_by(id=int(request.form['work_order_id'])).first_or_404()
+            status = request.form.get('status')
+            if status not in WorkOrder.STATUSES:
+                abort(400)
+            wo.status = status
+            db.session.commit()
+            flash(f'Work order marked {status}.', 'success')
+
         return redirect(url_for('main.vehicle_detail', vehicle_id=vehicle_id))
 
     # GET → render the detail page
-    return render_template('vehicle_detail.html', vehicle=v)
+    work_orders = v.work_orders.order_by(WorkOrder.date.desc(), WorkOrder.id.desc()).all()
+    return render_template('vehicle_detail.html', vehicle=v, work_orders=work_orders,
+                           statuses=WorkOrder.STATUSES,
+                           fuel_logs=fuel_history(v.id),                # hot + archived, newest first
+                           maintenance_logs=maintenance_history(v.id))
 
 # ────────────────────────────────────────────────────────────────────────────────
 @main.route('/add', methods=['GET', 'POST'])
@@ -248,17 +366,82 @@ def delete_vehicle(vehicle_id):
     """
     Delete a vehicle:
       - Access: admin only
-      - Cascades to remove related work orders via model backref
+      - Queues a background job; the cascade over work orders, logs and
+        archived history runs in the worker, not in this request
     """
     if current_user.role != 'admin':
         flash('Access denied.', 'warning')
         return redirect(url_for('main.home'))
 
     v = Vehicle.query.get_or_404(vehicle_id)
-    db.session.delete(v)
-    db.session.commit()
-    flash('Vehicle deleted.', 'success')
+    enqueue('delete_vehicle', {'vehicle_id': v.id},
+            priority=PRIORITY_INTERACTIVE, created_by=current_user.id)
+    flash(f'Vehicle {v.unit_no or v.id} will be deleted shortly.', 'success')
     return redirect(url_for('main.home'))
+
+# ────────────────────────────────────────────────────────────────────────────────
+@main.route('/fuel/reconcile', methods=['GET', 'POST'])
+@login_required
+def reconcile_fuel():
+    """
+    Upload a fuel-card statement:
+      - Access: admin or technician only
+      - POST: save the CSV under instance/statements and queue a reconcile job
+    """
+    if current_user.role not in ('admin', 'technician'):
+        flash('Access denied.', 'warning')
+        return redirect(url_for('main.home'))
+
+    if request.method == 'POST':
+        statement = request.files.get('statement')
+        if not statement or not statement.filename.lower().endswith('.csv'):
+            flash('Please choose a .csv statement file.', 'warning')
+            return redirect(url_for('main.reconcile_fuel'))
+
+        folder = os.path.join(current_app.instance_path, 'statements')
+        os.makedirs(folder, exist_ok=True)
+        fn = f"{datetime.utcnow():%Y%m%d%H%M%S}_{secure_filename(statement.filename)}"
+        path = os.path.join(folder, fn)
+        statement.save(path)
+
+        job = enqueue('reconcile_fuel', {'path': path},
+                      priority=PRIORITY_IMPORT, created_by=current_user.id)
+        flash('Statement uploaded; reconciliation is running in the background.', 'success')
+        return redirect(url_for('main.job_detail', job_id=job.id))
+
+    return render_template('reconcile_fuel.html')
+
+# ────────────────────────────────────────────────────────────────────────────────
+@main.route('/jobs')
+@login_required
+def job_list():
+    """
+    Background job status page:
+      - GET parameters:
+          status = optional filter (queued / running / succeeded / failed)
+          page   = page number for pagination
+    """
+    status = request.args.get('status', '').strip()
+    page = request.args.get('page', 1, type=int)
+
+    query = Job.query
+    if status:
+        query = query.filter(Job.status == status)
+    pagination = query.order_by(Job.id.desc()).paginate(page=page, per_page=25, error_out=False)
+    return render_template('jobs.html', pagination=pagination, status=status, statuses=Job.STATUSES)
+
+@main.route('/jobs/<int:job_id>')
+@login_required
+def job_detail(job_id):
+    """Single job: progress, result and last error; JSON if asked for with ?format=json."""
+    job = Job.query.get_or_404(job_id)
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'id': job.id, 'kind': job.kind, 'status': job.status,
+            'progress': job.progress, 'message': job.message, 'result': job.result,
+            'attempts': job.attempts, 'max_attempts': job.max_attempts,
+        })
+    return render_template('job_detail.html', job=job)
 # app/routes.py
 
 from flask import render_template, request, redirect, url_for, flash
@@ -270,7 +453,7 @@ from datetime import datetime
 @main.route('/vehicle/<int:vehicle_id>/logs')
 def view_logs(vehicle_id):
     vehicle = Vehicle.query.get_or_404(vehicle_id)
-    logs = MaintenanceLog.query.filter_by(vehicle_id=vehicle_id).order_by(MaintenanceLog.service_date.desc()).all()
+    logs = maintenance_history(vehicle_id)  # hot + archived, newest first
     return render_template('maintenance_logs.html', vehicle=vehicle, logs=logs)
 
 # Add new log entry
@@ -0,0 +1,117 @@
+# app/routing.py
+# Read/write session routing.
+# GET requests read through a read-only engine, reporting queries through
+# their own small pool, and anything that writes (flushes, INSERT/UPDATE/DELETE)
+# always goes to the primary engine.
+
+import functools
+import os
+from contextlib import contextmanager
+
+from flask import current_app, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# ────────────────────────────────────────────────────────────────────────────────
+class RoutingSession(Session):
+    """
+    db.session class that picks an engine per statement:
+    - session.info['route'] == 'read' or 'report' → that engine for plain SELECTs
+    - flushes and INSERT/UPDATE/DELETE statements → primary, whatever the route
+    Without a route (CLI, worker, background threads) everything uses primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        route = self.info.get('route')
+        if (
+            bind is None
+            and route
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and getattr(clause, '_for_update_arg', None) is None
+        ):
+            engine = current_app.extensions.get('fleet_routing', {}).get(route)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+# ────────────────────────────────────────────────────────────────────────────────
+def _readonly_sqlite_uri(primary_url):
+    """file: URI opening the primary SQLite file read-only, or None if not SQLite."""
+    if primary_url.get_backend_name() != 'sqlite' or not primary_url.database:
+        return None
+    if primary_url.database == ':memory:':
+        return None
+    path = os.path.abspath(primary_url.database)
+    return f'sqlite:///file:{path}?mode=ro&uri=true'
+
+def _use_wal(engine):
+    """
+    WAL lets readers and the single writer proceed without blocking each other.
+    Only main: the archive is written rarely and keeps its rollback journal.
+    """
+    @event.listens_for(engine, 'connect')
+    def _set_wal(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA main.journal_mode=WAL')
+
+def init_app(app):
+    """
+    Build the read and report engines and route each request's session:
+    - SQLALCHEMY_READ_URI / SQLALCHEMY_REPORT_URI point at a replica if set;
+      otherwise both open the primary SQLite file with mode=ro
+    - the primary is switched to WAL so readers never hold the writer lock
+    Call after db.create_all(), so the database and archive files exist.
+    """
+    from . import db, archive
+
+    with app.app_context():
+        primary = db.engine
+        if primary.url.get_backend_name() == 'sqlite' and app.config['FLEET_SQLITE_WAL']:
+            _use_wal(primary)
+            primary.dispose()   # reconnect so existing pooled connections pick up WAL
+        fallback = _readonly_sqlite_uri(primary.url)
+
+    engines = {}
+    for route, uri_key, size_key in (
+        ('read', 'SQLALCHEMY_READ_URI', 'FLEET_READ_POOL_SIZE'),
+        ('report', 'SQLALCHEMY_REPORT_URI', 'FLEET_REPORT_POOL_SIZE'),
+    ):
+        uri = app.config.get(uri_key) or fallback
+        if not uri:
+            continue
+        engine = create_engine(uri, pool_size=app.config[size_key], max_overflow=0, pool_timeout=30)
+        if engine.url.get_backend_name() == 'sqlite':
+            archive.attach(engine, app.config['FLEET_ARCHIVE_PATH'], readonly=True)
+        engines[route] = engine
+    app.extensions['fleet_routing'] = engines
+
+    @app.before_request
+    def _route_session():
+        db.session.info['route'] = 'read' if request.method in READ_METHODS else None
+
+# ────────────────────────────────────────────────────────────────────────────────
+@contextmanager
+def routed(route):
+    """Run the enclosed queries on `route` ('read', 'report' or None for primary)."""
+    from . import db
+
+    info = db.session.info
+    previous = info.get('route')
+    info['route'] = route
+    try:
+        yield
+    finally:
+        info['route'] = previous
+
+def uses_route(route):
+    """View decorator: run the whole handler on `route`, e.g. @uses_route('report')."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with routed(route):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
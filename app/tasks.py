@@ -0,0 +1,90 @@
+# app/tasks.py
+# Job handlers for the background queue (see app/jobs.py).
+# Each handler takes (ctx, **payload) and returns a JSON-able result.
+
+from datetime import date
+
+from flask import current_app
+
+from .jobs import handler, enqueue
+from .models import Vehicle, FuelLog
+from . import db
+
+# Priorities: interactive follow-ups first, batch reports last
+PRIORITY_INTERACTIVE = 10
+PRIORITY_IMPORT      = 5
+PRIORITY_NOTIFY      = 0
+PRIORITY_REPORT      = -5
+
+# ────────────────────────────────────────────────────────────────────────────────
+@handler('delete_vehicle')
+def delete_vehicle(ctx, vehicle_id):
+    """Delete a vehicle and everything hanging off it."""
+    v = db.session.get(Vehicle, vehicle_id)
+    if v is None:
+        return {'deleted': False}
+    # fuel_logs has no delete cascade on the relationship; clear them explicitly
+    FuelLog.query.filter_by(vehicle_id=vehicle_id).delete()
+    db.session.delete(v)
+    db.session.commit()
+    return {'deleted': True, 'unit_no': v.unit_no}
+
+@handler('reconcile_fuel')
+def reconcile_fuel(ctx, path):
+    """Reconcile an uploaded fuel-card statement (see app/fuelcard.py)."""
+    from .fuelcard import read_statement, reconcile_statement
+
+    transactions = read_statement(path)
+    ctx.progress(0.1, f'Read {len(transactions)} transactions')
+    report = reconcile_statement(transactions)
+    return {
+        'total':      report['total'],
+        'inserted':   report['inserted'],
+        'relinked':   report['relinked'],
+        'unmatched':  len(report['unmatched']),
+        'duplicates': len(report['duplicates']),
+        'invalid':    len(report['invalid']),
+    }
+
+@handler('forecast')
+def forecast(ctx, workers=None):
+    """Recompute the replacement forecast (see app/forecast.py)."""
+    from .forecast import run_forecast
+
+    return {'vehicles': run_forecast(workers=workers)}
+
+@handler('archive')
+def archive(ctx, before=None):
+    """Archive old logs and reclaim space (see app/archive.py)."""
+    from .archive import archive_before, default_cutoff, reclaim_space
+
+    cutoff = date.fromisoformat(before) if before else default_cutoff(current_app)
+    moved = archive_before(cutoff)
+    ctx.progress(0.8, 'Reclaiming space')
+    return {'cutoff': cutoff.isoformat(), 'moved': moved, 'vacuum': reclaim_space()}
+
+# ────────────────────────────────────────────────────────────────────────────────
+@handler('renewal_digest')
+def renewal_digest(ctx, notice_days=None):
+    """
+    Build renewal digests and queue one send_email job per recipient,
+    so a bad address or SMTP hiccup only retries that one message.
+    """
+    from .notifications import build_digests, render_digest
+
+    notice_days = notice_days or current_app.config['FLEET_RENEWAL_NOTICE_DAYS']
+    digests = build_digests(notice_days=notice_days)
+    for address, items in digests.items():
+        enqueue('send_email', {
+            'to': address,
+            'subject': f'Fleet renewals: {len(items)} due within {notice_days} days',
+            'body': render_digest(items),
+        }, priority=PRIORITY_NOTIFY, max_attempts=5, commit=False)
+    db.session.commit()
+    return {'recipients': len(digests), 'renewals': sum(len(i) for i in digests.values())}
+
+@handler('send_email')
+def send_email(ctx, to, subject, body):
+    from .notifications import send_email as send
+
+    return {'to': to, 'sent': send(to, subject, body)}
@@ -0,0 +1,55 @@
+# app/utils.py
+# Small parsing helpers shared by the import, reconciliation and reporting jobs
+
+from datetime import datetime, date
+
+# Date layouts seen in Fleetmate exports and fuel-card statements
+DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%m/%d/%Y',
+    '%m/%d/%y',
+    '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y %H:%M:%S',
+    '%Y%m%d',
+)
+
+def parse_date(value):
+    """
+    Parse a date from a Fleetmate field or statement column.
+    Returns a datetime.date, or None if the value is blank or unreadable.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = str(value).strip()
+    if not text:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def parse_number(value):
+    """
+    Parse a number from a Fleetmate field or statement column.
+    Strips currency signs and thousands separators; returns a float or None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value).strip().replace('$', '').replace(',', '')
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
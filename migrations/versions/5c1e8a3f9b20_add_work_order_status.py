@@ -0,0 +1,26 @@
+"""Add work order status
+
+Revision ID: 5c1e8a3f9b20
+Revises: 221fe7a76512
+Create Date: 2026-10-19 09:12:41.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e8a3f9b20'
+down_revision = '221fe7a76512'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('work_order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'))
+
+
+def downgrade():
+    with op.batch_alter_table('work_order', schema=None) as batch_op:
+        batch_op.drop_column('status')
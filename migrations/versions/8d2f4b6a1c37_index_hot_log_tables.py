@@ -0,0 +1,36 @@
+"""Index hot fuel and maintenance logs by vehicle and date
+
+Revision ID: 8d2f4b6a1c37
+Revises: 5c1e8a3f9b20
+Create Date: 2026-10-19 15:40:08.517320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f4b6a1c37'
+down_revision = '5c1e8a3f9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('fuel_log', schema=None) as batch_op:
+        batch_op.create_index('ix_fuel_log_vehicle_date', ['vehicle_id', 'date'], unique=False)
+        batch_op.create_index('ix_fuel_log_date', ['date'], unique=False)
+
+    with op.batch_alter_table('maintenance_log', schema=None) as batch_op:
+        batch_op.create_index('ix_maintenance_log_vehicle_date', ['vehicle_id', 'service_date'], unique=False)
+        batch_op.create_index('ix_maintenance_log_service_date', ['service_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_log_service_date')
+        batch_op.drop_index('ix_maintenance_log_vehicle_date')
+
+    with op.batch_alter_table('fuel_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_fuel_log_date')
+        batch_op.drop_index('ix_fuel_log_vehicle_date')